@@ -0,0 +1,44 @@
+"""
+backend/app/schemas/_line_math.py
+حساب المبالغ الصغرى لبنود الفاتورة - وحدة قابلة للتجميع بـ Cython
+
+الدوال هنا هي المسار العددي الساخن لكل بند (تستدعى حتى 4 مرات لكل بند
+عند التحويل). الوحدة مكتوبة بأسلوب Python خالص يقبله Cython كما هو:
+setup.py في جذر المستودع يُجمِّعها إلى امتداد C عند توفر Cython ومُجمِّع،
+ويحل الامتداد محل هذا الملف عند الاستيراد؛ وإلا يعمل المصدر الخالص كما هو.
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+def to_minor(value, scale=100):
+    """تحويل مبلغ عشري إلى وحدات صغرى (هللات/سنتات) كعدد صحيح
+
+    يرفع ValueError للمدخلات غير الرقمية أو غير المنتهية حتى يغلّفها
+    Pydantic كـ ValidationError بدل تسريب InvalidOperation للمستدعي.
+    """
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Invalid monetary amount: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Monetary amount must be finite, got {value!r}")
+    return int((amount * scale).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_minor(minor, scale_digits=2):
+    """تحويل وحدات صغرى إلى قيمة عشرية للعرض والتسلسل"""
+    return Decimal(minor).scaleb(-scale_digits)
+
+
+def expected_line_total_minor(
+    quantity, unit_price_minor, discount_minor, tax_amount_minor
+):
+    """المجموع المتوقع لبند واحد بالوحدات الصغرى
+
+    الكمية تدخل بدقتها الكاملة (float) والسعر بالوحدات الصغرى؛ التقريب
+    يجري مرة واحدة فقط على ناتج الضرب.
+    """
+    return (
+        int(round(quantity * unit_price_minor)) - discount_minor + tax_amount_minor
+    )
@@ -0,0 +1,66 @@
+"""
+backend/app/schemas/_validate_kernels.py
+نواة رقمية للتحقق من مجاميع البنود دفعة واحدة
+
+بدل تشغيل حساب Decimal لكل بند على حدة في مُحقِّق Python، تُجمع مبالغ
+الفاتورة كوحدات صغرى (هللات/سنتات) في مصفوفات int64 وتُفحص في تمريرة
+واحدة بحساب أعداد صحيحة خالص. عند توفر Numba تُجمَّع الحلقة إلى كود آلة
+عند الاستيراد؛ وإلا يُستخدم مسار NumPy المتجهي.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+
+    _HAVE_NUMBA = True
+except ImportError:  # Numba مُسرِّع اختياري وليس متطلباً أساسياً
+    _HAVE_NUMBA = False
+
+
+if _HAVE_NUMBA:
+
+    @njit(
+        "boolean[:](float64[:], int64[:], int64[:], int64[:], int64[:], int64)",
+        cache=True,
+    )
+    def _mismatch_mask(quantity, unit_price, discount, tax_amount, line_total, tol):
+        n = quantity.shape[0]
+        mask = np.empty(n, dtype=np.bool_)
+        for i in range(n):
+            expected = (
+                round(quantity[i] * unit_price[i]) - discount[i] + tax_amount[i]
+            )
+            mask[i] = abs(expected - line_total[i]) > tol
+        return mask
+
+else:
+
+    def _mismatch_mask(quantity, unit_price, discount, tax_amount, line_total, tol):
+        expected = np.rint(quantity * unit_price) - discount + tax_amount
+        return np.abs(expected - line_total) > tol
+
+
+def line_total_mismatches(
+    quantity: np.ndarray,
+    unit_price_minor: np.ndarray,
+    discount_minor: np.ndarray,
+    tax_amount_minor: np.ndarray,
+    line_total_minor: np.ndarray,
+    tol: int = 1,
+) -> np.ndarray:
+    """إرجاع فهارس كل البنود غير المتطابقة (مصفوفة فارغة = كل البنود سليمة)
+
+    الكمية تبقى float64 بدقتها الكاملة (كسور مثل 0.125 مشروعة) والسعر
+    بالوحدات الصغرى، فالمجموع المتوقع بالوحدات الصغرى هو
+    expected = round(quantity * unit_price_minor).
+    """
+    mask = _mismatch_mask(
+        quantity,
+        unit_price_minor,
+        discount_minor,
+        tax_amount_minor,
+        line_total_minor,
+        tol,
+    )
+    return np.nonzero(mask)[0]
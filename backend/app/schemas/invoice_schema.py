@@ -3,11 +3,73 @@ backend/app/schemas/invoice_schema.py
 المخططات الأساسية لبيانات الفواتير
 """
 
-from pydantic import BaseModel, Field, validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    TypeAdapter,
+    computed_field,
+    field_validator,
+    model_validator,
+)
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 from decimal import Decimal
 from enum import Enum
+from functools import lru_cache
+import sys
+import time
+
+import fastjsonschema
+import numpy as np
+import orjson
+from pydantic_core import PydanticCustomError
+
+from ..utils._checksums import iban_checksum_valid
+from ._line_math import expected_line_total_minor, from_minor, to_minor
+from ._validate_kernels import line_total_mismatches
+
+# كل العملات المدعومة ذات كسور مئوية (هللة، سنت، فلس، قرش)
+CURRENCY_SCALE = {"SAR": 100, "USD": 100, "EUR": 100, "AED": 100, "EGP": 100}
+
+# ثوابت مشتركة تُبنى مرة واحدة عند الاستيراد بدل إعادة تحليلها لكل استخدام:
+# _ZERO قيمة افتراضية موحّدة للحقول، و _CENT سماحية الفروق (قرش/هللة واحدة)
+_ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+
+# الحد الأعلى للمبالغ بالوحدات الصغرى: 2**53 يبقى دقيقاً في float64 وآمناً
+# في int64، فلا تفيض مصفوفات النواة ولا يفقد حساب المجاميع دقته
+_MINOR_MAX = 2**53
+
+# الحد الأعلى للكمية: حاصل _QUANTITY_MAX * _MINOR_MAX يبقى منتهياً في
+# float64، فلا يفيض ضرب الكمية في السعر إلى inf في النواة أو المجاميع
+_QUANTITY_MAX = 1e12
+
+
+# الحساب الفعلي في _line_math (وحدة قابلة للتجميع بـ Cython عبر setup.py)
+_to_minor = to_minor
+_from_minor = from_minor
+
+
+@lru_cache(maxsize=1)
+def _today_cached(tick: int) -> date:
+    return date.today()
+
+
+def _today() -> date:
+    """تاريخ اليوم بذاكرة مؤقتة بدقة ثانية - يوفر نداء النظام لكل فاتورة"""
+    return _today_cached(int(time.monotonic()))
+
+
+@lru_cache(maxsize=1)
+def _now_cached(tick: int) -> datetime:
+    return datetime.now()
+
+
+def _now() -> datetime:
+    """وقت حالي بدقة 10 مللي ثانية - تكفي لطابع وقت الاستخراج وتوفر
+    نداء الساعة لكل فاتورة أثناء إعادة المعالجة الدفعية"""
+    return _now_cached(time.monotonic_ns() // 10_000_000)
 
 
 class InvoiceType(str, Enum):
@@ -38,37 +100,129 @@ class Language(str, Enum):
     MIXED = "mixed"
 
 
+# دمج قيم الـ Enums في جدول السلاسل الداخلي مرة واحدة عند الاستيراد:
+# التفريغ (في Rust وفي Python) يعيد استخدام نفس كائن .value المُدمج،
+# فتصبح مقارنات مفاتيح القواميس مطابقة مؤشرات بدل تجزئة + مقارنة محارف
+for _enum in (InvoiceType, Currency, Language):
+    for _member in _enum:
+        _member._value_ = sys.intern(_member.value)
+
+
 class InvoiceLineItem(BaseModel):
     """بند واحد من بنود الفاتورة"""
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     description: str = Field(..., description="وصف المنتج أو الخدمة")
     description_ar: Optional[str] = Field(None, description="الوصف بالعربية")
     description_en: Optional[str] = Field(None, description="الوصف بالإنجليزية")
-    quantity: float = Field(..., gt=0, description="الكمية")
-    unit_price: Decimal = Field(..., description="سعر الوحدة")
+    quantity: float = Field(
+        ..., gt=0, le=_QUANTITY_MAX, allow_inf_nan=False, description="الكمية"
+    )
+    unit_price_minor: int = Field(
+        default=0, ge=0, le=_MINOR_MAX,
+        description="سعر الوحدة بالوحدات الصغرى (هللة/سنت)"
+    )
     unit: Optional[str] = Field(None, description="وحدة القياس (كجم، قطعة، متر، إلخ)")
-    discount: Decimal = Field(default=Decimal("0"), ge=0, description="الخصم")
-    tax_rate: Decimal = Field(default=Decimal("0"), ge=0, description="نسبة الضريبة %")
-    tax_amount: Decimal = Field(default=Decimal("0"), ge=0, description="مبلغ الضريبة")
-    line_total: Decimal = Field(..., description="المجموع الكلي للبند")
+    discount_minor: int = Field(
+        default=0, ge=0, le=_MINOR_MAX, description="الخصم بالوحدات الصغرى"
+    )
+    tax_rate: Decimal = Field(default=_ZERO, ge=0, description="نسبة الضريبة %")
+    tax_amount_minor: int = Field(
+        default=0, ge=0, le=_MINOR_MAX, description="مبلغ الضريبة بالوحدات الصغرى"
+    )
+    line_total_minor: int = Field(
+        default=0, ge=0, le=_MINOR_MAX,
+        description="المجموع الكلي للبند بالوحدات الصغرى"
+    )
     item_code: Optional[str] = Field(None, description="كود الصنف")
 
-    @validator("line_total")
-    def validate_line_total(cls, v, values):
-        """التحقق من صحة المجموع"""
-        if "quantity" in values and "unit_price" in values:
-            expected = (
-                Decimal(str(values["quantity"])) * values["unit_price"]
-            ) - values.get("discount", Decimal("0"))
-            expected += values.get("tax_amount", Decimal("0"))
-            if abs(expected - v) > Decimal("0.01"):
-                raise ValueError(f"Line total mismatch: expected {expected}, got {v}")
-        return v
+    @model_validator(mode="before")
+    @classmethod
+    def convert_amounts_to_minor(cls, data):
+        """قبول المبالغ العشرية القادمة من LLM وتحويلها إلى وحدات صغرى"""
+        if not isinstance(data, dict):
+            return data
+        converted = None
+        for major, minor in (
+            ("unit_price", "unit_price_minor"),
+            ("discount", "discount_minor"),
+            ("tax_amount", "tax_amount_minor"),
+            ("line_total", "line_total_minor"),
+        ):
+            if major in data:
+                if converted is None:
+                    converted = dict(data)
+                value = converted.pop(major)
+                if minor not in converted:
+                    converted[minor] = _to_minor(value)
+        data = converted if converted is not None else data
+        for major, minor in (("unit_price", "unit_price_minor"),
+                             ("line_total", "line_total_minor")):
+            if minor not in data:
+                raise ValueError(f"{major} is required")
+        return data
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def unit_price(self) -> Decimal:
+        """سعر الوحدة كقيمة عشرية"""
+        return _from_minor(self.unit_price_minor)
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def discount(self) -> Decimal:
+        """الخصم كقيمة عشرية"""
+        return _from_minor(self.discount_minor)
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def tax_amount(self) -> Decimal:
+        """مبلغ الضريبة كقيمة عشرية"""
+        return _from_minor(self.tax_amount_minor)
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def line_total(self) -> Decimal:
+        """المجموع الكلي للبند كقيمة عشرية"""
+        return _from_minor(self.line_total_minor)
+
+
+def compute_totals(items: List[InvoiceLineItem]):
+    """تجميع مجاميع الفاتورة من البنود: (subtotal, discount, tax, total)
+
+    الجمع يجري على مصفوفات int64 في C بدل حلقة Decimal في المفسر -
+    يفيد خصوصاً فواتير المرافق/الاتصالات ذات عشرات أو مئات البنود.
+    """
+    n = len(items)
+    quantity = np.fromiter(
+        (item.quantity for item in items), dtype=np.float64, count=n
+    )
+    unit_price = np.fromiter(
+        (item.unit_price_minor for item in items), dtype=np.int64, count=n
+    )
+    discount = np.fromiter(
+        (item.discount_minor for item in items), dtype=np.int64, count=n
+    )
+    tax_amount = np.fromiter(
+        (item.tax_amount_minor for item in items), dtype=np.int64, count=n
+    )
+    subtotal_minor = int(np.rint(quantity * unit_price).sum())
+    discount_minor = int(discount.sum())
+    tax_minor = int(tax_amount.sum())
+    return (
+        _from_minor(subtotal_minor),
+        _from_minor(discount_minor),
+        _from_minor(tax_minor),
+        _from_minor(subtotal_minor - discount_minor + tax_minor),
+    )
 
 
 class VendorInfo(BaseModel):
     """معلومات المورد"""
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     name: str = Field(..., description="اسم المورد")
     name_ar: Optional[str] = Field(None, description="الاسم بالعربية")
     name_en: Optional[str] = Field(None, description="الاسم بالإنجليزية")
@@ -90,6 +244,8 @@ class VendorInfo(BaseModel):
 class CustomerInfo(BaseModel):
     """معلومات العميل (الشركة المشترية)"""
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     name: str = Field(..., description="اسم العميل")
     tax_id: Optional[str] = Field(None, description="الرقم الضريبي")
     registration_number: Optional[str] = Field(None, description="رقم السجل التجاري")
@@ -102,6 +258,8 @@ class CustomerInfo(BaseModel):
 class TaxBreakdown(BaseModel):
     """تفصيل الضريبة"""
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     tax_type: str = Field(..., description="نوع الضريبة (VAT, GST, Excise, etc.)")
     tax_rate: Decimal = Field(..., ge=0, description="نسبة الضريبة %")
     taxable_amount: Decimal = Field(..., ge=0, description="المبلغ الخاضع للضريبة")
@@ -111,6 +269,8 @@ class TaxBreakdown(BaseModel):
 class PaymentInfo(BaseModel):
     """معلومات الدفع"""
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     payment_method: Optional[str] = Field(
         None, description="طريقة الدفع (نقدي، بنكي، آجل)"
     )
@@ -123,6 +283,14 @@ class PaymentInfo(BaseModel):
     iban: Optional[str] = Field(None, description="IBAN")
     swift_code: Optional[str] = Field(None, description="SWIFT Code")
 
+    @field_validator("iban")
+    @classmethod
+    def validate_iban(cls, v):
+        """التحقق من رقم IBAN عبر فحص mod-97 (ISO 13616)"""
+        if v is not None and not iban_checksum_valid(v):
+            raise ValueError(f"Invalid IBAN checksum: {v}")
+        return v
+
 
 class Invoice(BaseModel):
     """نموذج الفاتورة الكامل - القلب النابض للنظام"""
@@ -160,9 +328,9 @@ class Invoice(BaseModel):
         ..., ge=0, description="المجموع الفرعي قبل الخصم والضريبة"
     )
     total_discount: Decimal = Field(
-        default=Decimal("0"), ge=0, description="إجمالي الخصم"
+        default=_ZERO, ge=0, description="إجمالي الخصم"
     )
-    total_tax: Decimal = Field(default=Decimal("0"), ge=0, description="إجمالي الضريبة")
+    total_tax: Decimal = Field(default=_ZERO, ge=0, description="إجمالي الضريبة")
     total_amount: Decimal = Field(..., ge=0, description="المبلغ الإجمالي النهائي")
 
     # ═══════════════════════════════════════════════════
@@ -192,45 +360,137 @@ class Invoice(BaseModel):
         default=0.0, ge=0, le=1, description="درجة الثقة في الاستخراج"
     )
     extraction_timestamp: datetime = Field(
-        default_factory=datetime.now, description="وقت الاستخراج"
+        default_factory=_now, description="وقت الاستخراج"
     )
     source_file: Optional[str] = Field(None, description="اسم الملف المصدر")
     page_count: Optional[int] = Field(None, description="عدد الصفحات")
 
-    @validator("total_amount")
-    def validate_total(cls, v, values):
+    @model_validator(mode="before")
+    @classmethod
+    def fill_missing_totals(cls, data):
+        """استكمال المجاميع الغائبة بتجميع متجهي واحد قبل مُحقِّقات الحقول"""
+        if not isinstance(data, dict) or not isinstance(data.get("line_items"), list):
+            return data
+        missing = [
+            key
+            for key in ("subtotal", "total_discount", "total_tax", "total_amount")
+            if key not in data
+        ]
+        if not missing:
+            return data
+        try:
+            items = LINE_ADAPTER.validate_python(data["line_items"])
+        except Exception:
+            # بنود مشوهة: يُترك الإبلاغ لمسار التحقق الاعتيادي
+            return data
+        subtotal, total_discount, total_tax, total_amount = compute_totals(items)
+        data = dict(data)
+        # البنود المُحقَّقة تُمرَّر كما هي حتى لا يُعاد التحقق منها
+        data["line_items"] = items
+        computed = {
+            "subtotal": subtotal,
+            "total_discount": total_discount,
+            "total_tax": total_tax,
+            "total_amount": total_amount,
+        }
+        for key in missing:
+            data[key] = computed[key]
+        return data
+
+    @model_validator(mode="after")
+    def validate_line_totals(self):
+        """التحقق من مجاميع كل البنود في تمريرة رقمية واحدة"""
+        n = len(self.line_items)
+        quantity = np.fromiter(
+            (item.quantity for item in self.line_items),
+            dtype=np.float64,
+            count=n,
+        )
+        unit_price = np.fromiter(
+            (item.unit_price_minor for item in self.line_items),
+            dtype=np.int64,
+            count=n,
+        )
+        discount = np.fromiter(
+            (item.discount_minor for item in self.line_items),
+            dtype=np.int64,
+            count=n,
+        )
+        tax_amount = np.fromiter(
+            (item.tax_amount_minor for item in self.line_items),
+            dtype=np.int64,
+            count=n,
+        )
+        line_total = np.fromiter(
+            (item.line_total_minor for item in self.line_items),
+            dtype=np.int64,
+            count=n,
+        )
+        bad = line_total_mismatches(
+            quantity, unit_price, discount, tax_amount, line_total
+        )
+        if bad.size:
+            # تُجمَّع كل الأخطاء في قائمة واحدة ويُرفع استثناء واحد فقط -
+            # بدون بناء traceback لكل بند على حدة
+            mismatches = []
+            for idx in bad.tolist():
+                item = self.line_items[idx]
+                expected_minor = expected_line_total_minor(
+                    item.quantity,
+                    item.unit_price_minor,
+                    item.discount_minor,
+                    item.tax_amount_minor,
+                )
+                mismatches.append(
+                    {
+                        "index": idx,
+                        "expected": str(_from_minor(int(expected_minor))),
+                        "actual": str(item.line_total),
+                    }
+                )
+            raise PydanticCustomError(
+                "line_total_mismatch",
+                "{count} line item(s) failed the line-total check",
+                {"count": len(mismatches), "items": mismatches},
+            )
+        return self
+
+    @model_validator(mode="after")
+    def validate_total(self):
         """التحقق من صحة المجموع النهائي"""
-        if (
-            "subtotal" in values
-            and "total_tax" in values
-            and "total_discount" in values
-        ):
-            expected = (
-                values["subtotal"] - values["total_discount"] + values["total_tax"]
+        expected = self.subtotal - self.total_discount + self.total_tax
+        if abs(expected - self.total_amount) > _CENT:
+            raise PydanticCustomError(
+                "total_amount_mismatch",
+                "Total amount mismatch: expected {expected}, got {actual}",
+                {"expected": str(expected), "actual": str(self.total_amount)},
             )
-            if abs(expected - v) > Decimal("0.01"):
-                raise ValueError(f"Total amount mismatch: expected {expected}, got {v}")
-        return v
+        return self
 
-    @validator("invoice_date")
+    @field_validator("invoice_date")
+    @classmethod
     def validate_date(cls, v):
         """التحقق من أن التاريخ ليس في المستقبل البعيد"""
-        if v > date.today():
-            if (v - date.today()).days > 30:
+        today = _today()
+        if v > today:
+            if (v - today).days > 30:
                 raise ValueError(f"Invoice date {v} is too far in the future")
         return v
 
     def to_dict(self) -> Dict[str, Any]:
-        """تحويل إلى قاموس"""
-        return self.dict(exclude_none=True)
-
-    class Config:
-        json_encoders = {
-            Decimal: lambda v: float(v),
-            datetime: lambda v: v.isoformat(),
-            date: lambda v: v.isoformat(),
-        }
-        use_enum_values = True
+        """تحويل إلى قاموس جاهز للتسلسل - التفريغ يجري في Rust ثم orjson يفك"""
+        return orjson.loads(self.model_dump_json(exclude_none=True))
+
+    def to_json_bytes(self) -> bytes:
+        """تسلسل الفاتورة مباشرة إلى JSON bytes لاستجابات HTTP"""
+        return self.model_dump_json(exclude_none=True).encode()
+
+    # الحقول التعدادية تبقى أعضاء Enum أصلية: مطابقة السلاسل الواردة تجري
+    # داخل pydantic-core، ومن يحتاج السلسلة يقرأ .value صراحة
+    model_config = ConfigDict(
+        ser_json_bytes="base64",
+        ser_json_timedelta="iso8601",
+    )
 
 
 class ExtractionResult(BaseModel):
@@ -272,5 +532,53 @@ class CustomerConfig(BaseModel):
     # Vendor mapping
     vendor_mapping_file: Optional[str] = Field(None, description="ملف ربط الموردين")
 
-    class Config:
-        use_enum_values = True
+
+# دمج أسماء الحقول المستخدمة كمفاتيح في to_dict/model_dump
+for _model in (
+    InvoiceLineItem,
+    VendorInfo,
+    CustomerInfo,
+    TaxBreakdown,
+    PaymentInfo,
+    Invoice,
+    ExtractionResult,
+    CustomerConfig,
+):
+    for _name in _model.model_fields:
+        sys.intern(_name)
+
+# Adapters مُجمَّعة مرة واحدة عند الاستيراد - يُعاد استخدامها عبر كل الاستدعاءات
+# بدل إعادة الدخول في آلية التجهيز لكل فاتورة على حدة
+INVOICE_ADAPTER = TypeAdapter(Invoice)
+INVOICE_LIST_ADAPTER = TypeAdapter(List[Invoice])
+LINE_ADAPTER = TypeAdapter(List[InvoiceLineItem])
+EXTRACTION_ADAPTER = TypeAdapter(ExtractionResult)
+
+validate_invoice = INVOICE_ADAPTER.validate_python
+validate_invoices = INVOICE_LIST_ADAPTER.validate_python
+
+# مُحقِّق شكل JSON مُولَّد كدالة Python مستقيمة - أرخص بكثير من بناء
+# ValidationError الكامل عند رفض مخرجات LLM المشوهة
+_INVOICE_JSON_SCHEMA = Invoice.model_json_schema()
+
+# مخطط البنود المُصدَّر لا يعرف أن convert_amounts_to_minor يقبل الشكل
+# العشري القادم من LLM، و extra="forbid" تغلق additionalProperties -
+# تُضاف المفاتيح العشرية صراحة حتى لا يرفضها فحص الشكل المسبق
+_line_item_def = _INVOICE_JSON_SCHEMA["$defs"]["InvoiceLineItem"]
+for _legacy_key in ("unit_price", "discount", "tax_amount", "line_total"):
+    _line_item_def["properties"].setdefault(
+        _legacy_key, {"anyOf": [{"type": "number"}, {"type": "string"}]}
+    )
+
+# use_default=False: فحص الشكل يجب ألا يعدّل الحمولة - الحقن الافتراضي كان
+# يزرع *_minor بقيمة 0 في البنود فيتخطى التحويل العشري لاحقاً
+_fast_validate = fastjsonschema.compile(_INVOICE_JSON_SCHEMA, use_default=False)
+
+
+def prevalidate_llm_json(payload: Dict[str, Any]) -> None:
+    """فحص شكل سريع لمخرجات LLM قبل بناء Invoice
+
+    يرفع fastjsonschema.JsonSchemaException عند خلل في الشكل، بحيث لا
+    يُستدعى مسار استثناءات Pydantic المكلف إلا على بيانات نظيفة الشكل.
+    """
+    _fast_validate(payload)
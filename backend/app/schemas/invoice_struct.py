@@ -0,0 +1,303 @@
+"""
+backend/app/schemas/invoice_struct.py
+نسخة msgspec من مخططات الفواتير للمسار الساخن (فك ترميز + تحقق في تمريرة واحدة)
+
+تُستخدم عند استخراج آلاف الفواتير من مخرجات LLM حيث يهيمن تشغيل
+مُحقِّقات Pydantic على وقت المعالج. نماذج Pydantic في invoice_schema.py
+تبقى المحوّل الرسمي عند حدود الـ API.
+"""
+
+from typing import Annotated, List, Optional
+from datetime import datetime, date
+from decimal import Decimal
+
+import msgspec
+from msgspec import Meta
+
+from . import invoice_schema as _schema
+from ._line_math import to_minor
+from .invoice_schema import InvoiceType, Currency, Language
+
+_ZERO = Decimal("0")
+_TOL = Decimal("0.01")
+
+
+class InvoiceLineItem(msgspec.Struct, frozen=True, gc=False):
+    """بند واحد من بنود الفاتورة"""
+
+    description: str
+    quantity: Annotated[float, Meta(gt=0)]
+    unit_price: Decimal
+    line_total: Decimal
+    description_ar: Optional[str] = None
+    description_en: Optional[str] = None
+    unit: Optional[str] = None
+    discount: Decimal = _ZERO
+    tax_rate: Decimal = _ZERO
+    tax_amount: Decimal = _ZERO
+    item_code: Optional[str] = None
+
+
+class VendorInfo(msgspec.Struct, frozen=True, gc=False):
+    """معلومات المورد"""
+
+    name: str
+    name_ar: Optional[str] = None
+    name_en: Optional[str] = None
+    tax_id: Optional[str] = None
+    registration_number: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    website: Optional[str] = None
+    mapped_vendor_code: Optional[str] = None
+
+
+class CustomerInfo(msgspec.Struct, frozen=True, gc=False):
+    """معلومات العميل (الشركة المشترية)"""
+
+    name: str
+    tax_id: Optional[str] = None
+    registration_number: Optional[str] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+    phone: Optional[str] = None
+
+
+class TaxBreakdown(msgspec.Struct, frozen=True, gc=False):
+    """تفصيل الضريبة"""
+
+    tax_type: str
+    tax_rate: Decimal
+    taxable_amount: Decimal
+    tax_amount: Decimal
+
+
+class PaymentInfo(msgspec.Struct, frozen=True, gc=False):
+    """معلومات الدفع"""
+
+    payment_method: Optional[str] = None
+    payment_terms: Optional[str] = None
+    due_date: Optional[date] = None
+    bank_name: Optional[str] = None
+    bank_account: Optional[str] = None
+    iban: Optional[str] = None
+    swift_code: Optional[str] = None
+
+
+class Invoice(msgspec.Struct, frozen=True):
+    """نموذج الفاتورة الكامل - نسخة الفك السريع"""
+
+    invoice_number: str
+    invoice_date: date
+    vendor: VendorInfo
+    line_items: List[InvoiceLineItem]
+    subtotal: Decimal
+    total_amount: Decimal
+    invoice_type: InvoiceType = InvoiceType.STANDARD
+    currency: Currency = Currency.SAR
+    language_detected: Language = Language.AR
+    customer: Optional[CustomerInfo] = None
+    total_discount: Decimal = _ZERO
+    total_tax: Decimal = _ZERO
+    tax_breakdown: Optional[List[TaxBreakdown]] = None
+    payment_info: Optional[PaymentInfo] = None
+    po_number: Optional[str] = None
+    reference_number: Optional[str] = None
+    notes: Optional[str] = None
+    qr_code: Optional[str] = None
+    confidence_score: Annotated[float, Meta(ge=0, le=1)] = 0.0
+    extraction_timestamp: Optional[datetime] = None
+    source_file: Optional[str] = None
+    page_count: Optional[int] = None
+
+
+# مُفكِّك مُجمَّع مرة واحدة عند الاستيراد - فك ترميز + تحقق بمستوى C
+DECODER = msgspec.json.Decoder(Invoice)
+
+
+def post_validate(invoice: Invoice) -> List[str]:
+    """فحوصات المجاميع بين الحقول بعد الفك - تُجمَّع الأخطاء بدون استثناءات"""
+    errors: List[str] = []
+
+    if not invoice.line_items:
+        errors.append("Invoice must contain at least one line item")
+
+    # msgspec لا يدعم قيود Meta على Decimal - كل فحوصات ge=0 الموجودة في
+    # نماذج Pydantic تُطبَّق هنا حتى لا يقبل المسار السريع ما يرفضه النموذج
+    if invoice.subtotal < 0:
+        errors.append(f"Subtotal must be >= 0, got {invoice.subtotal}")
+    if invoice.total_discount < 0:
+        errors.append(f"Total discount must be >= 0, got {invoice.total_discount}")
+    if invoice.total_tax < 0:
+        errors.append(f"Total tax must be >= 0, got {invoice.total_tax}")
+    if invoice.total_amount < 0:
+        errors.append(f"Total amount must be >= 0, got {invoice.total_amount}")
+
+    for idx, item in enumerate(invoice.line_items):
+        if item.unit_price < 0:
+            errors.append(
+                f"Line {idx}: unit price must be >= 0, got {item.unit_price}"
+            )
+        if item.line_total < 0:
+            errors.append(
+                f"Line {idx}: line total must be >= 0, got {item.line_total}"
+            )
+        if item.discount < 0:
+            errors.append(f"Line {idx}: discount must be >= 0, got {item.discount}")
+        if item.tax_rate < 0:
+            errors.append(f"Line {idx}: tax rate must be >= 0, got {item.tax_rate}")
+        if item.tax_amount < 0:
+            errors.append(
+                f"Line {idx}: tax amount must be >= 0, got {item.tax_amount}"
+            )
+        expected = (
+            Decimal(str(item.quantity)) * item.unit_price
+        ) - item.discount + item.tax_amount
+        if abs(expected - item.line_total) > _TOL:
+            errors.append(
+                f"Line {idx}: total mismatch: expected {expected}, "
+                f"got {item.line_total}"
+            )
+
+    if invoice.tax_breakdown:
+        for idx, breakdown in enumerate(invoice.tax_breakdown):
+            if (
+                breakdown.tax_rate < 0
+                or breakdown.taxable_amount < 0
+                or breakdown.tax_amount < 0
+            ):
+                errors.append(
+                    f"Tax breakdown {idx}: rate and amounts must be >= 0"
+                )
+
+    expected_total = invoice.subtotal - invoice.total_discount + invoice.total_tax
+    if abs(expected_total - invoice.total_amount) > _TOL:
+        errors.append(
+            f"Total amount mismatch: expected {expected_total}, "
+            f"got {invoice.total_amount}"
+        )
+
+    return errors
+
+
+def decode_invoice(data: bytes) -> Invoice:
+    """فك ترميز JSON إلى فاتورة - يرفع msgspec.ValidationError عند خطأ في الشكل"""
+    return DECODER.decode(data)
+
+
+# ═══════════════════════════════════════════════════
+# Raw ingest - مسار الإدخال الموثوق بلا إعادة تحقق
+# ═══════════════════════════════════════════════════
+
+
+class RawInvoiceLineItem(msgspec.Struct, frozen=True, gc=False):
+    """بند خام من مخرجات LLM - أنواع فقط، بلا قيود ولا فحوصات بينية"""
+
+    description: str
+    quantity: float
+    unit_price: Decimal
+    line_total: Decimal
+    description_ar: Optional[str] = None
+    description_en: Optional[str] = None
+    unit: Optional[str] = None
+    discount: Decimal = _ZERO
+    tax_rate: Decimal = _ZERO
+    tax_amount: Decimal = _ZERO
+    item_code: Optional[str] = None
+
+
+class RawInvoice(msgspec.Struct, frozen=True):
+    """فاتورة خام من مخرجات LLM - للإدخال الذي سبق فحص شكله فقط"""
+
+    invoice_number: str
+    invoice_date: date
+    vendor: VendorInfo
+    line_items: List[RawInvoiceLineItem]
+    subtotal: Decimal
+    total_amount: Decimal
+    invoice_type: InvoiceType = InvoiceType.STANDARD
+    currency: Currency = Currency.SAR
+    language_detected: Language = Language.AR
+    customer: Optional[CustomerInfo] = None
+    total_discount: Decimal = _ZERO
+    total_tax: Decimal = _ZERO
+    tax_breakdown: Optional[List[TaxBreakdown]] = None
+    payment_info: Optional[PaymentInfo] = None
+    po_number: Optional[str] = None
+    reference_number: Optional[str] = None
+    notes: Optional[str] = None
+    qr_code: Optional[str] = None
+    confidence_score: float = 0.0
+    extraction_timestamp: Optional[datetime] = None
+    source_file: Optional[str] = None
+    page_count: Optional[int] = None
+
+
+RAW_DECODER = msgspec.json.Decoder(RawInvoice)
+
+
+def _construct(model_cls, struct) -> object:
+    """بناء نموذج Pydantic من Struct مسطّح بدون تشغيل المُحقِّقات"""
+    if struct is None:
+        return None
+    return model_cls.model_construct(**msgspec.structs.asdict(struct))
+
+
+def canonicalize(raw: RawInvoice) -> _schema.Invoice:
+    """تحويل فاتورة خام موثوقة إلى نموذج Invoice القانوني بلا إعادة تحقق
+
+    يُستخدم بعد نجاح فحص الشكل (prevalidate_llm_json أو RAW_DECODER):
+    model_construct يتخطى تمريرة المُحقِّقات كاملة، فلا تُدفع كلفة التحقق
+    إلا مرة واحدة لكل مستند في المسار الموثوق.
+    """
+    line_items = [
+        _schema.InvoiceLineItem.model_construct(
+            description=item.description,
+            description_ar=item.description_ar,
+            description_en=item.description_en,
+            quantity=item.quantity,
+            unit_price_minor=to_minor(item.unit_price),
+            unit=item.unit,
+            discount_minor=to_minor(item.discount),
+            tax_rate=item.tax_rate,
+            tax_amount_minor=to_minor(item.tax_amount),
+            line_total_minor=to_minor(item.line_total),
+            item_code=item.item_code,
+        )
+        for item in raw.line_items
+    ]
+    kwargs = dict(
+        invoice_number=raw.invoice_number,
+        invoice_type=raw.invoice_type,
+        invoice_date=raw.invoice_date,
+        currency=raw.currency,
+        language_detected=raw.language_detected,
+        vendor=_construct(_schema.VendorInfo, raw.vendor),
+        customer=_construct(_schema.CustomerInfo, raw.customer),
+        line_items=line_items,
+        subtotal=raw.subtotal,
+        total_discount=raw.total_discount,
+        total_tax=raw.total_tax,
+        total_amount=raw.total_amount,
+        tax_breakdown=(
+            None
+            if raw.tax_breakdown is None
+            else [_construct(_schema.TaxBreakdown, tb) for tb in raw.tax_breakdown]
+        ),
+        payment_info=_construct(_schema.PaymentInfo, raw.payment_info),
+        po_number=raw.po_number,
+        reference_number=raw.reference_number,
+        notes=raw.notes,
+        qr_code=raw.qr_code,
+        confidence_score=raw.confidence_score,
+        source_file=raw.source_file,
+        page_count=raw.page_count,
+    )
+    # عند غيابه يُترك الحقل لمصنعه الافتراضي في model_construct
+    if raw.extraction_timestamp is not None:
+        kwargs["extraction_timestamp"] = raw.extraction_timestamp
+    return _schema.Invoice.model_construct(**kwargs)
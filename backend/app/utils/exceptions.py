@@ -3,11 +3,17 @@ backend/app/utils/exceptions.py
 جميع الاستثناءات المخصصة للنظام
 """
 
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, Callable
+
+import orjson
 
 
 class InvoiceAIException(Exception):
     """الاستثناء الأساسي لجميع أخطاء النظام"""
+    __slots__ = ("message", "error_code", "details")
+    _ERR_CODE = "GENERAL_ERROR"
+
     def __init__(
         self, 
         message: str, 
@@ -15,7 +21,7 @@ class InvoiceAIException(Exception):
         details: Optional[Dict[str, Any]] = None
     ):
         self.message = message
-        self.error_code = error_code or "GENERAL_ERROR"
+        self.error_code = error_code or self._ERR_CODE
         self.details = details or {}
         super().__init__(self.message)
     
@@ -27,6 +33,10 @@ class InvoiceAIException(Exception):
             "details": self.details
         }
 
+    def to_json_bytes(self) -> bytes:
+        """تسلسل الخطأ مباشرة إلى JSON bytes عبر orjson لاستجابات الـ API"""
+        return orjson.dumps(self.to_dict())
+
 
 # ═══════════════════════════════════════════════════
 # File & OCR Exceptions
@@ -34,20 +44,22 @@ class InvoiceAIException(Exception):
 
 class FileProcessingError(InvoiceAIException):
     """خطأ في معالجة الملف"""
+    __slots__ = ()
+    _ERR_CODE = "FILE_PROCESSING_ERROR"
     def __init__(self, message: str, filename: Optional[str] = None):
         super().__init__(
             message=message,
-            error_code="FILE_PROCESSING_ERROR",
             details={"filename": filename}
         )
 
 
 class UnsupportedFileTypeError(InvoiceAIException):
     """نوع ملف غير مدعوم"""
+    __slots__ = ()
+    _ERR_CODE = "UNSUPPORTED_FILE_TYPE"
     def __init__(self, file_type: str, supported_types: list):
         super().__init__(
             message=f"File type '{file_type}' is not supported",
-            error_code="UNSUPPORTED_FILE_TYPE",
             details={
                 "file_type": file_type,
                 "supported_types": supported_types
@@ -57,20 +69,22 @@ class UnsupportedFileTypeError(InvoiceAIException):
 
 class OCRError(InvoiceAIException):
     """خطأ في عملية OCR"""
+    __slots__ = ()
+    _ERR_CODE = "OCR_ERROR"
     def __init__(self, message: str, image_path: Optional[str] = None):
         super().__init__(
             message=message,
-            error_code="OCR_ERROR",
             details={"image_path": image_path}
         )
 
 
 class EmptyFileError(InvoiceAIException):
     """ملف فارغ"""
+    __slots__ = ()
+    _ERR_CODE = "EMPTY_FILE"
     def __init__(self, filename: str):
         super().__init__(
             message=f"File '{filename}' is empty or contains no readable content",
-            error_code="EMPTY_FILE",
             details={"filename": filename}
         )
 
@@ -81,40 +95,44 @@ class EmptyFileError(InvoiceAIException):
 
 class LLMExtractionError(InvoiceAIException):
     """خطأ في استخراج البيانات من LLM"""
+    __slots__ = ()
+    _ERR_CODE = "LLM_EXTRACTION_ERROR"
     def __init__(self, message: str, model: Optional[str] = None):
         super().__init__(
             message=message,
-            error_code="LLM_EXTRACTION_ERROR",
             details={"model": model}
         )
 
 
 class LLMTimeoutError(InvoiceAIException):
     """انتهت مهلة LLM"""
+    __slots__ = ()
+    _ERR_CODE = "LLM_TIMEOUT"
     def __init__(self, timeout_seconds: int):
         super().__init__(
             message=f"LLM request timed out after {timeout_seconds} seconds",
-            error_code="LLM_TIMEOUT",
             details={"timeout_seconds": timeout_seconds}
         )
 
 
 class LLMRateLimitError(InvoiceAIException):
     """تجاوز حد معدل الطلبات لـ LLM"""
+    __slots__ = ()
+    _ERR_CODE = "LLM_RATE_LIMIT"
     def __init__(self, retry_after: Optional[int] = None):
         super().__init__(
             message="LLM rate limit exceeded",
-            error_code="LLM_RATE_LIMIT",
             details={"retry_after_seconds": retry_after}
         )
 
 
 class ValidationError(InvoiceAIException):
     """خطأ في التحقق من صحة البيانات المستخرجة"""
+    __slots__ = ()
+    _ERR_CODE = "VALIDATION_ERROR"
     def __init__(self, message: str, field: Optional[str] = None, validation_errors: Optional[list] = None):
         super().__init__(
             message=message,
-            error_code="VALIDATION_ERROR",
             details={
                 "field": field,
                 "validation_errors": validation_errors or []
@@ -124,10 +142,11 @@ class ValidationError(InvoiceAIException):
 
 class LowConfidenceError(InvoiceAIException):
     """درجة ثقة منخفضة في الاستخراج"""
+    __slots__ = ()
+    _ERR_CODE = "LOW_CONFIDENCE"
     def __init__(self, confidence_score: float, threshold: float):
         super().__init__(
             message=f"Extraction confidence ({confidence_score:.2f}) below threshold ({threshold:.2f})",
-            error_code="LOW_CONFIDENCE",
             details={
                 "confidence_score": confidence_score,
                 "threshold": threshold
@@ -141,40 +160,44 @@ class LowConfidenceError(InvoiceAIException):
 
 class ERPConnectionError(InvoiceAIException):
     """خطأ في الاتصال بنظام ERP"""
+    __slots__ = ()
+    _ERR_CODE = "ERP_CONNECTION_ERROR"
     def __init__(self, message: str, erp_system: str):
         super().__init__(
             message=message,
-            error_code="ERP_CONNECTION_ERROR",
             details={"erp_system": erp_system}
         )
 
 
 class ERPAuthenticationError(InvoiceAIException):
     """خطأ في المصادقة مع نظام ERP"""
+    __slots__ = ()
+    _ERR_CODE = "ERP_AUTH_ERROR"
     def __init__(self, erp_system: str):
         super().__init__(
             message=f"Authentication failed for {erp_system}",
-            error_code="ERP_AUTH_ERROR",
             details={"erp_system": erp_system}
         )
 
 
 class ERPDataFormatError(InvoiceAIException):
     """خطأ في صيغة البيانات المرسلة لـ ERP"""
+    __slots__ = ()
+    _ERR_CODE = "ERP_DATA_FORMAT_ERROR"
     def __init__(self, message: str, expected_format: Optional[str] = None):
         super().__init__(
             message=message,
-            error_code="ERP_DATA_FORMAT_ERROR",
             details={"expected_format": expected_format}
         )
 
 
 class ERPTimeoutError(InvoiceAIException):
     """انتهت مهلة الاتصال بـ ERP"""
+    __slots__ = ()
+    _ERR_CODE = "ERP_TIMEOUT"
     def __init__(self, erp_system: str, timeout_seconds: int):
         super().__init__(
             message=f"Connection to {erp_system} timed out after {timeout_seconds} seconds",
-            error_code="ERP_TIMEOUT",
             details={
                 "erp_system": erp_system,
                 "timeout_seconds": timeout_seconds
@@ -184,10 +207,11 @@ class ERPTimeoutError(InvoiceAIException):
 
 class DuplicateInvoiceError(InvoiceAIException):
     """فاتورة مكررة"""
+    __slots__ = ()
+    _ERR_CODE = "DUPLICATE_INVOICE"
     def __init__(self, invoice_number: str, existing_id: Optional[str] = None):
         super().__init__(
             message=f"Invoice '{invoice_number}' already exists",
-            error_code="DUPLICATE_INVOICE",
             details={
                 "invoice_number": invoice_number,
                 "existing_id": existing_id
@@ -201,30 +225,33 @@ class DuplicateInvoiceError(InvoiceAIException):
 
 class CustomerNotFoundError(InvoiceAIException):
     """عميل غير موجود"""
+    __slots__ = ()
+    _ERR_CODE = "CUSTOMER_NOT_FOUND"
     def __init__(self, customer_id: str):
         super().__init__(
             message=f"Customer '{customer_id}' not found",
-            error_code="CUSTOMER_NOT_FOUND",
             details={"customer_id": customer_id}
         )
 
 
 class ConfigurationError(InvoiceAIException):
     """خطأ في الإعدادات"""
+    __slots__ = ()
+    _ERR_CODE = "CONFIGURATION_ERROR"
     def __init__(self, message: str, config_file: Optional[str] = None):
         super().__init__(
             message=message,
-            error_code="CONFIGURATION_ERROR",
             details={"config_file": config_file}
         )
 
 
 class VendorMappingError(InvoiceAIException):
     """خطأ في ربط المورد"""
+    __slots__ = ()
+    _ERR_CODE = "VENDOR_MAPPING_ERROR"
     def __init__(self, vendor_name: str, customer_id: str):
         super().__init__(
             message=f"Vendor '{vendor_name}' not found in mapping for customer '{customer_id}'",
-            error_code="VENDOR_MAPPING_ERROR",
             details={
                 "vendor_name": vendor_name,
                 "customer_id": customer_id
@@ -238,19 +265,21 @@ class VendorMappingError(InvoiceAIException):
 
 class AuthenticationError(InvoiceAIException):
     """خطأ في المصادقة"""
+    __slots__ = ()
+    _ERR_CODE = "AUTHENTICATION_ERROR"
     def __init__(self, message: str = "Authentication failed"):
         super().__init__(
             message=message,
-            error_code="AUTHENTICATION_ERROR"
         )
 
 
 class AuthorizationError(InvoiceAIException):
     """خطأ في الصلاحيات"""
+    __slots__ = ()
+    _ERR_CODE = "AUTHORIZATION_ERROR"
     def __init__(self, message: str = "Insufficient permissions", required_permission: Optional[str] = None):
         super().__init__(
             message=message,
-            error_code="AUTHORIZATION_ERROR",
             details={"required_permission": required_permission}
         )
 
@@ -261,10 +290,11 @@ class AuthorizationError(InvoiceAIException):
 
 class MaxRetriesExceededError(InvoiceAIException):
     """تجاوز الحد الأقصى من المحاولات"""
+    __slots__ = ()
+    _ERR_CODE = "MAX_RETRIES_EXCEEDED"
     def __init__(self, operation: str, max_retries: int):
         super().__init__(
             message=f"Operation '{operation}' failed after {max_retries} retries",
-            error_code="MAX_RETRIES_EXCEEDED",
             details={
                 "operation": operation,
                 "max_retries": max_retries
@@ -276,13 +306,11 @@ class MaxRetriesExceededError(InvoiceAIException):
 # Helper Functions
 # ═══════════════════════════════════════════════════
 
-def handle_exception(exception: Exception) -> Dict[str, Any]:
-    """
-    معالج مركزي للاستثناءات - يحول أي استثناء إلى استجابة API موحدة
-    """
-    if isinstance(exception, InvoiceAIException):
-        return exception.to_dict()
-    
+def _handle_invoice_ai(exception: Exception) -> Dict[str, Any]:
+    return exception.to_dict()
+
+
+def _handle_generic(exception: Exception) -> Dict[str, Any]:
     # استثناءات Python العامة
     return {
         "error": "INTERNAL_ERROR",
@@ -290,4 +318,62 @@ def handle_exception(exception: Exception) -> Dict[str, Any]:
         "details": {
             "exception_type": type(exception).__name__
         }
-    }
\ No newline at end of file
+    }
+
+
+# جدول نوع -> معالج يُبنى عند الاستيراد؛ البحث فيه مطابقة مؤشرات بدل
+# سلسلة isinstance تنمو مع كل نوع استثناء جديد
+_HANDLERS: Dict[type, Callable[[Exception], Dict[str, Any]]] = {
+    InvoiceAIException: _handle_invoice_ai,
+    Exception: _handle_generic,
+}
+
+
+# الأنواع التي تتكرر متطابقة في عواصف إعادة المحاولة (انقطاع LLM أو ERP)
+# وتفاصيلها قابلة للتجزئة - استجاباتها تُبنى مرة واحدة وتُعاد من الذاكرة
+_CACHEABLE_TYPES = frozenset({LLMRateLimitError, LLMTimeoutError, ERPTimeoutError})
+
+
+@lru_cache(maxsize=512)
+def _cached_response(
+    error_code: str, message: str, details_key: tuple
+) -> Dict[str, Any]:
+    return {
+        "error": error_code,
+        "message": message,
+        "details": dict(details_key)
+    }
+
+
+def handle_exception(exception: Exception) -> Dict[str, Any]:
+    """
+    معالج مركزي للاستثناءات - يحول أي استثناء إلى استجابة API موحدة
+    """
+    if type(exception) in _CACHEABLE_TYPES:
+        try:
+            # التجزئة نفسها تجري داخل lru_cache، لذا يبقى النداء داخل try
+            cached = _cached_response(
+                exception.error_code,
+                exception.message,
+                tuple(sorted(exception.details.items())),
+            )
+        except TypeError:
+            pass  # تفاصيل غير قابلة للتجزئة: يُبنى الرد بالمسار الاعتيادي
+        else:
+            # نسخ سطحي للرد وتفاصيله حتى لا يفسد تعديلُ مستدعٍ واحدٍ
+            # الردودَ المخزَّنة لبقية المستدعين
+            response = dict(cached)
+            response["details"] = dict(cached["details"])
+            return response
+    handler = _HANDLERS.get(type(exception))
+    if handler is None:
+        # أول مرة يظهر هذا النوع: نمشي على الـ MRO مرة واحدة ثم نخزّن
+        # المعالج المحسوم حتى تكون الاستدعاءات اللاحقة بحثاً مباشراً
+        for base in type(exception).__mro__:
+            handler = _HANDLERS.get(base)
+            if handler is not None:
+                break
+        else:
+            handler = _handle_generic
+        _HANDLERS[type(exception)] = handler
+    return handler(exception)
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""
+setup.py
+خطوة بناء اختيارية: تجميع وحدات الحساب الساخنة في المخططات بـ Cython
+
+python setup.py build_ext --inplace
+
+عند غياب Cython أو مُجمِّع C يُتخطى البناء ويستخدم النظام المصدر
+الخالص كما هو - لا يوجد أي اعتماد إجباري على الامتدادات المُجمَّعة.
+"""
+
+from setuptools import setup
+
+try:
+    from Cython.Build import cythonize
+
+    ext_modules = cythonize(
+        ["backend/app/schemas/_line_math.py"],
+        compiler_directives={"language_level": "3"},
+    )
+except ImportError:
+    ext_modules = []
+
+setup(
+    name="ai-ap-automation-agent",
+    ext_modules=ext_modules,
+)